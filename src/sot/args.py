@@ -1,10 +1,27 @@
+from __future__ import annotations
 import time
-from typing import Any, List
+from typing import TYPE_CHECKING, Any
 import click
 
-from sot import btrfs
 from sot.utils import ensure_path
 
+# sot.btrfs pulls in btrfsutil and sqlite3, import it only once a value is
+# actually converted so that help and completion stay cheap
+if TYPE_CHECKING:
+    from click.shell_completion import CompletionItem
+
+    from sot import btrfs
+
+
+def get_storage(ctx: click.Context | None = None) -> btrfs.SnapshotStorage:
+    """Open the snapshot storage on first use, honoring the group's --root."""
+    from sot import btrfs
+
+    if ctx is None:
+        ctx = click.get_current_context(silent=True)
+    root = ctx.find_root().params.get("root") if ctx is not None else None
+    return btrfs.get_storage(root)
+
 
 class Volume(click.ParamType):
     name = "volume"
@@ -17,8 +34,11 @@ class Volume(click.ParamType):
     def convert(
         self, value: Any, param: click.Parameter | None, ctx: click.Context | None
     ) -> Any:
+        from sot import btrfs
+
         if isinstance(value, btrfs.Volume):
             return value
+        get_storage(ctx)
         try:
             path = ensure_path(value)
             if path.exists() and path.is_dir():
@@ -36,14 +56,37 @@ class Volume(click.ParamType):
 
     def shell_complete(
         self, ctx: click.Context, param: click.Parameter, incomplete: str
-    ) -> List[click.shell_completion.CompletionItem]:
+    ) -> list[CompletionItem]:
         from click.shell_completion import CompletionItem
 
         if ctx.command.name not in ("create", "rm"):
-            return [CompletionItem(v.path) for v in btrfs.STORAGE.volumes()]
+            return [
+                CompletionItem(p)
+                for p in _volume_paths(ctx)
+                if p.startswith(incomplete)
+            ]
         return [CompletionItem(incomplete, type="dir")]
 
 
+def _volume_paths(ctx: click.Context) -> list[str]:
+    """Volume paths of the storage, cached on disk for shell completion."""
+    from sot import btrfs, cache, config
+
+    root = ctx.find_root().params.get("root")
+    if root is None:
+        root = btrfs.SnapshotStorage.find_storage()
+    root = ensure_path(root).resolve()
+    # the index may have been written by another user, with another cache dir
+    db = root / config.SNAPSHOT_DIR / "index.db"
+    stamp = cache.stamp(db, db.with_name("index.db-wal"))
+    key = str(root)
+    paths = cache.load("volumes", key, stamp)
+    if paths is None:
+        paths = [v.path for v in get_storage(ctx).iter_volumes_light()]
+        cache.store("volumes", key, stamp, paths)
+    return paths
+
+
 def volume(exists=True, has_snapshots=False, **kwargs):
     return click.argument(
         "volume",
@@ -62,6 +105,8 @@ class Snapshot(click.ParamType):
     def convert(
         self, value: Any, param: click.Parameter | None, ctx: click.Context | None
     ) -> Any:
+        from sot import btrfs
+
         if isinstance(value, btrfs.Snapshot):
             return value
         try:
@@ -86,16 +131,26 @@ class Snapshot(click.ParamType):
 
     def shell_complete(
         self, ctx: click.Context, param: click.Parameter, incomplete: str
-    ) -> List[click.shell_completion.CompletionItem]:
+    ) -> list[CompletionItem]:
         from click.shell_completion import CompletionItem
 
         volume: btrfs.Volume = ctx.params["volume"]
-        return [CompletionItem(n) for n in volume.snapshots.keys()]
+        return [
+            CompletionItem(n)
+            for n in volume.snapshot_names()
+            if n.startswith(incomplete)
+        ]
+
+
+def _generate_name() -> str:
+    from sot import btrfs
+
+    return btrfs.Snapshot.generate_name()
 
 
 def snapshot(decl="snapshot", exists=True, nargs=1, required=True, new=False, **kwargs):
     if new:
-        kwargs.setdefault("default", btrfs.Snapshot.generate_name() if nargs != -1 else None)
+        kwargs.setdefault("default", _generate_name if nargs != -1 else None)
         required = False
         exists = False
 
@@ -1,14 +1,20 @@
 from __future__ import annotations
-from datetime import datetime
-import hashlib
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import functools
 import os
 from pathlib import Path
+import secrets
 import shutil
+from time import localtime, strftime
+from typing import NamedTuple
 import btrfsutil
 import sqlite3
 
 from sot.utils import ensure_path, escape, unescape
-from sot import config
+from sot import cache, config
+from sot.style import GREEN_BOLD, RESET, YELLOW, YELLOW_BOLD
 
 
 STORAGE: SnapshotStorage = None
@@ -43,6 +49,51 @@ class NoStorageError(FileNotFoundError):
     pass
 
 
+class VolumeRef(NamedTuple):
+    """Lightweight volume row, for callers that don't touch the filesystem."""
+
+    id: int
+    path: str
+
+
+# bumped whenever _SCHEMA changes, stored in the database's user_version
+_SCHEMA_VERSION = 3
+
+_PRAGMAS = """
+PRAGMA foreign_keys = ON;
+"""
+
+# The rollback journal lets users without write access to .sot read the index,
+# WAL readers need to create index.db-shm next to it. Version 2 used WAL.
+_SCHEMA = f"""
+PRAGMA journal_mode = DELETE;
+CREATE TABLE IF NOT EXISTS volumes (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    volume_id INTEGER NOT NULL,
+    name TEXT,
+    time REAL,
+    annotation TEXT,
+    FOREIGN KEY (volume_id) REFERENCES volumes (id) ON DELETE CASCADE,
+    UNIQUE (volume_id, name)
+);
+-- Stores the "HEAD" of the volume, i.e. the last check-out snapshot, if there is one.
+CREATE TABLE IF NOT EXISTS volumes_head (
+    volume_id INTEGER PRIMARY KEY,
+    head_snapshot_id INTEGER,
+    FOREIGN KEY (volume_id) REFERENCES volumes (id) ON DELETE CASCADE,
+    FOREIGN KEY (head_snapshot_id) REFERENCES snapshots (id) ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS idx_volume_path ON volumes (path);
+CREATE INDEX IF NOT EXISTS idx_snapshot_volume_id ON snapshots (volume_id);
+CREATE INDEX IF NOT EXISTS idx_snapshot_volume_time ON snapshots (volume_id, time);
+PRAGMA user_version = {_SCHEMA_VERSION};
+"""
+
+
 class SnapshotStorage:
     def __init__(self, root: Path | None = None) -> None:
         if root is None:
@@ -56,46 +107,49 @@ class SnapshotStorage:
         self._conn.row_factory = sqlite3.Row
         self._cur = self._conn.cursor()
         self._init_db()
+        # read results, memoized until the next write
+        self._memo: dict[tuple, object] = {}
+        self._in_batch = False
+
+    def _invalidate_memo(self):
+        self._memo.clear()
+
+    def _transaction(self):
+        # inside batch() the outer transaction commits
+        return contextlib.nullcontext() if self._in_batch else self._conn
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Commit the writes made in the block as a single transaction.
+
+        The writes are committed even if the block raises: they record changes,
+        such as deleted subvolumes, that have already happened on disk.
+        """
+        if self._in_batch:
+            yield
+            return
+        self._in_batch = True
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        finally:
+            self._in_batch = False
+            self._conn.commit()
 
     def _init_db(self):
-        with self._conn:
-            self._cur.execute("PRAGMA foreign_keys = ON")
-        self._create_tables()
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == _SCHEMA_VERSION:
+            self._conn.executescript(_PRAGMAS)
+            return
+        try:
+            self._conn.executescript(_PRAGMAS + _SCHEMA)
+        except sqlite3.OperationalError as e:
+            # an outdated index opened read-only is still readable
+            if e.sqlite_errorcode != sqlite3.SQLITE_READONLY:
+                raise
 
     def _create_tables(self):
-        with self._conn:
-            self._cur.execute("""
-                CREATE TABLE IF NOT EXISTS volumes (
-                    id INTEGER PRIMARY KEY,
-                    path TEXT UNIQUE
-                )
-            """)
-            self._cur.execute("""
-                CREATE TABLE IF NOT EXISTS snapshots (
-                    id INTEGER PRIMARY KEY,
-                    volume_id INTEGER NOT NULL,
-                    name TEXT,
-                    time REAL,
-                    annotation TEXT,
-                    FOREIGN KEY (volume_id) REFERENCES volumes (id) ON DELETE CASCADE,
-                    UNIQUE (volume_id, name)
-                )
-            """)
-            # Stores the "HEAD" of the volume, i.e. the last check-out snapshot, if there is one.
-            self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS volumes_head (
-                    volume_id INTEGER PRIMARY KEY,
-                    head_snapshot_id INTEGER,
-                    FOREIGN KEY (volume_id) REFERENCES volumes (id) ON DELETE CASCADE,
-                    FOREIGN KEY (head_snapshot_id) REFERENCES snapshots (id) ON DELETE SET NULL
-                )
-            """)
-            self._cur.execute(
-                "CREATE INDEX IF NOT EXISTS idx_volume_path ON volumes (path)"
-            )
-            self._cur.execute(
-                "CREATE INDEX IF NOT EXISTS idx_snapshot_volume_id ON snapshots (volume_id)"
-            )
+        self._conn.executescript(_SCHEMA)
 
     def load(self, obj: "Snapshot" | "Volume", force=False):
         # object is already loaded
@@ -103,15 +157,15 @@ class SnapshotStorage:
             return
 
         if isinstance(obj, Volume):
-            with self._conn:
+            with self._transaction():
                 row = self._cur.execute(
-                    "SELECT id FROM volumes WHERE path = ?", (str(obj.path),)
+                    "SELECT id FROM volumes WHERE path = ?", (obj._spath,)
                 ).fetchone()
                 if row is not None:
                     obj.id = row["id"]
         if isinstance(obj, Snapshot):
             self.load(obj.volume)
-            with self._conn:
+            with self._transaction():
                 row = self._cur.execute(
                     "SELECT id, time, annotation FROM snapshots WHERE volume_id = ? AND name = ?",
                     (obj.volume.id, obj.name),
@@ -120,26 +174,30 @@ class SnapshotStorage:
                     raise SnapshotNotFound(obj)
                 obj.time = row["time"]
                 obj.id = row["id"]
-                obj.annotation = row["annotation"]
+                obj._annotation = row["annotation"]
 
     def update(self, obj: "Snapshot" | "Volume"):
+        self._invalidate_memo()
         if isinstance(obj, Snapshot):
             self.load(obj)
-            with self._conn:
+            with self._transaction():
                 self._cur.execute(
                     "UPDATE snapshots SET name = ?, time = ?, annotation = ? WHERE id = ?",
                     (obj.name, obj.time, obj.annotation, obj.id),
                 )
         elif isinstance(obj, Volume):
             self.load(obj)
-            with self._conn:
+            with self._transaction():
                 self._cur.execute(
-                    "UPDATE volumes SET path = ? WHERE id = ?", (str(obj.path), obj.id)
+                    "UPDATE volumes SET path = ? WHERE id = ?", (obj._spath, obj.id)
                 )
 
     def register(self, obj: "Snapshot" | "Volume"):
+        self._invalidate_memo()
         if isinstance(obj, Snapshot):
-            with self._conn:
+            # the volume must be registered first, see Snapshot.create
+            assert obj.volume.id is not None
+            with self._transaction():
                 self._cur.execute(
                     "INSERT OR REPLACE INTO snapshots (volume_id, name, time, annotation) VALUES (?, ?, ?, ?)",
                     (obj.volume.id, obj.name, obj.time, obj.annotation),
@@ -147,9 +205,12 @@ class SnapshotStorage:
                 if self._cur.rowcount > 0:
                     obj.id = self._cur.lastrowid
         elif isinstance(obj, Volume):
-            with self._conn:
+            # already registered
+            if obj.id is not None:
+                return
+            with self._transaction():
                 self._cur.execute(
-                    "INSERT OR IGNORE INTO volumes (path) VALUES (?)", (str(obj.path),)
+                    "INSERT OR IGNORE INTO volumes (path) VALUES (?)", (obj._spath,)
                 )
                 if self._cur.rowcount > 0:
                     obj.id = self._cur.lastrowid
@@ -157,54 +218,156 @@ class SnapshotStorage:
                         "INSERT OR IGNORE INTO volumes_head (volume_id) VALUES (?)",
                         (obj.id,),
                     )
+                    cache.invalidate("volumes", str(self.root))
                 else:
                     self.load(obj)
 
     def unregister(self, obj: "Snapshot" | "Volume"):
+        self._invalidate_memo()
         if isinstance(obj, Snapshot):
             self.load(obj.volume)
 
-            with self._conn:
+            with self._transaction():
                 self._cur.execute(
                     "DELETE FROM snapshots WHERE volume_id = ? AND (name = ? OR id = ?)",
                     (obj.volume.id, obj.name, obj.id),
                 )
         elif isinstance(obj, Volume):
-            with self._conn:
+            with self._transaction():
                 if obj.id is None:
                     return
 
                 self._cur.execute("DELETE FROM volumes WHERE id = ?", (obj.id,))
+            cache.invalidate("volumes", str(self.root))
 
     def snapshots(self, volume: "Volume") -> dict[str, Snapshot]:
         self.load(volume)
-        with self._conn:
+        key = ("snapshots", volume.id)
+        if key in self._memo:
+            return self._memo[key]
+        with self._transaction():
             rows = self._cur.execute(
                 "SELECT id, name, time, annotation FROM snapshots WHERE volume_id = ? ORDER BY time DESC",
                 (volume.id,),
             ).fetchall()
-        return {
-            row["name"]: Snapshot(
-                volume=volume,
-                id=row["id"],
-                name=row["name"],
-                time=row["time"],
-                annotation=row["annotation"],
-            )
+        snapshots = self._memo[key] = {
+            row["name"]: self._snapshot_from_row(volume, row)
             for row in rows
         }
+        return snapshots
+
+    def snapshot_names(self, volume: "Volume") -> list[str]:
+        self.load(volume)
+        with self._transaction():
+            rows = self._cur.execute(
+                "SELECT name FROM snapshots WHERE volume_id = ? ORDER BY time DESC",
+                (volume.id,),
+            ).fetchall()
+        return [row["name"] for row in rows]
+
+    def count_snapshots(self, volume: "Volume") -> int:
+        self.load(volume)
+        with self._transaction():
+            row = self._cur.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE volume_id = ?", (volume.id,)
+            ).fetchone()
+        return row[0]
+
+    def snapshots_before(self, volume: "Volume", time: float) -> list[Snapshot]:
+        self.load(volume)
+        with self._transaction():
+            rows = self._cur.execute(
+                "SELECT id, name, time, annotation FROM snapshots WHERE volume_id = ? AND time < ? ORDER BY time DESC",
+                (volume.id, time),
+            ).fetchall()
+        return [self._snapshot_from_row(volume, row) for row in rows]
+
+    def stale_snapshots(self, volume: "Volume", keep: int) -> list[Snapshot]:
+        """Snapshots of a volume except the latest `keep` ones."""
+        self.load(volume)
+        with self._transaction():
+            rows = self._cur.execute(
+                "SELECT id, name, time, annotation FROM snapshots WHERE volume_id = ? ORDER BY time DESC LIMIT -1 OFFSET ?",
+                (volume.id, keep),
+            ).fetchall()
+        return [self._snapshot_from_row(volume, row) for row in rows]
+
+    @staticmethod
+    def _snapshot_from_row(volume: "Volume", row: sqlite3.Row) -> Snapshot:
+        return Snapshot(
+            volume=volume,
+            id=row["id"],
+            name=row["name"],
+            time=row["time"],
+            annotation=row["annotation"],
+        )
+
+    def snapshot_rows(
+        self, volume: "Volume"
+    ) -> list[tuple[str, str | None, str, bool]]:
+        """(name, annotation, strtime, is_head) of each snapshot of a volume."""
+        self.load(volume)
+        with self._transaction():
+            rows = self._cur.execute(
+                """
+                SELECT name, annotation, time, snapshots.id = head_snapshot_id
+                FROM snapshots
+                LEFT JOIN volumes_head ON volumes_head.volume_id = snapshots.volume_id
+                WHERE snapshots.volume_id = ?
+                ORDER BY time DESC
+            """,
+                (volume.id,),
+            ).fetchall()
+        return [
+            (name, annotation, format_time(int(time)), bool(is_head))
+            for name, annotation, time, is_head in rows
+        ]
 
-    def volumes(self):
-        with self._conn:
+    def volumes_with_snapshot_rows(
+        self,
+    ) -> dict[str, list[tuple[str, str | None, str, bool]]]:
+        """snapshot_rows of all volumes keyed by volume path, in a single query."""
+        with self._transaction():
+            rows = self._cur.execute(
+                """
+                SELECT path, name, annotation, time, snapshots.id = head_snapshot_id
+                FROM volumes
+                LEFT JOIN snapshots ON snapshots.volume_id = volumes.id
+                LEFT JOIN volumes_head ON volumes_head.volume_id = volumes.id
+                ORDER BY path, time DESC
+            """
+            ).fetchall()
+        result: dict[str, list[tuple[str, str | None, str, bool]]] = {}
+        for path, name, annotation, time, is_head in rows:
+            volume_rows = result.setdefault(path, [])
+            if name is not None:
+                volume_rows.append(
+                    (name, annotation, format_time(int(time)), bool(is_head))
+                )
+        return result
+
+    def volumes(self) -> list[Volume]:
+        key = ("volumes",)
+        if key not in self._memo:
+            self._memo[key] = [
+                Volume.from_ref(ref) for ref in self.iter_volumes_light()
+            ]
+        return self._memo[key]
+
+    def iter_volumes_light(self):
+        with self._transaction():
             rows = self._cur.execute(
                 "SELECT id, path FROM volumes ORDER BY path"
             ).fetchall()
         for id, path in rows:
-            yield Volume(path=path, id=id)
+            yield VolumeRef(id, path)
 
     def head(self, volume: Volume) -> Snapshot | None:
         self.load(volume)
-        with self._conn:
+        key = ("head", volume.id)
+        if key in self._memo:
+            return self._memo[key]
+        with self._transaction():
             row = self._cur.execute(
                 """
                 SELECT id, name, time, annotation, head_snapshot_id
@@ -214,20 +377,16 @@ class SnapshotStorage:
             """,
                 (volume.id,),
             ).fetchone()
-        if row is None:
-            return None
-        return Snapshot(
-            volume=volume,
-            id=row["id"],
-            name=row["name"],
-            time=row["time"],
-            annotation=row["annotation"],
+        head = self._memo[key] = (
+            None if row is None else self._snapshot_from_row(volume, row)
         )
+        return head
 
     def set_head(self, volume: Volume, snapshot: Snapshot):
+        self._invalidate_memo()
         self.load(volume)
         self.load(snapshot)
-        with self._conn:
+        with self._transaction():
             self._cur.execute(
                 "UPDATE volumes_head SET head_snapshot_id = ? WHERE volume_id = ?",
                 (snapshot.id, volume.id),
@@ -235,20 +394,40 @@ class SnapshotStorage:
 
     def rebuild_metadata(self):
         """Rebuild the database from .sot storage and recover creation times if possible."""
+        self._invalidate_memo()
 
         # drop existing tables and indexes
-        with self._conn:
+        with self._transaction():
             self._cur.execute("DROP TABLE IF EXISTS volumes")
             self._cur.execute("DROP TABLE IF EXISTS snapshots")
             self._cur.execute("DROP TABLE IF EXISTS volumes_head")
             self._cur.execute("DROP INDEX IF EXISTS idx_volume_path")
             self._cur.execute("DROP INDEX IF EXISTS idx_snapshot_volume_id")
+            self._cur.execute("DROP INDEX IF EXISTS idx_snapshot_volume_time")
 
         self._create_tables()
-        for volume in self.volumes_from_filesystem():
-            self.register(volume)
-            for snapshot in self.snapshots_from_filesystem(volume):
-                self.register(snapshot)
+        volumes = list(self.volumes_from_filesystem())
+        # stat() calls release the GIL, scan snapshot dirs concurrently
+        if len(volumes) < 4:
+            scanned = [self._scan_snapshots(v) for v in volumes]
+        else:
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                scanned = list(pool.map(self._scan_snapshots, volumes))
+
+        with self._transaction():
+            for volume, entries in zip(volumes, scanned):
+                self._cur.execute(
+                    "INSERT INTO volumes (path) VALUES (?)", (volume._spath,)
+                )
+                volume.id = self._cur.lastrowid
+                self._cur.execute(
+                    "INSERT INTO volumes_head (volume_id) VALUES (?)", (volume.id,)
+                )
+                self._cur.executemany(
+                    "INSERT INTO snapshots (volume_id, name, time) VALUES (?, ?, ?)",
+                    [(volume.id, name, ctime) for name, ctime in entries],
+                )
+        cache.invalidate("volumes", str(self.root))
 
     def volumes_from_filesystem(self):
         """Yield volumes found in the filesystem."""
@@ -256,23 +435,27 @@ class SnapshotStorage:
             if volume_path.is_dir():
                 yield Volume(path=unescape(volume_path.name))
 
-    def snapshots_from_filesystem(self, volume: Volume):
-        """Yield snapshots found in the filesystem for a given volume."""
-        for snapshot_path in volume.storage.iterdir():
-            if snapshot_path.is_dir():
-                snapshot = Snapshot(volume, snapshot_path.name)
-                snapshot.time = snapshot_path.stat().st_ctime
-                yield snapshot
+    @staticmethod
+    def _scan_snapshots(volume: Volume) -> list[tuple[str, float]]:
+        """Return (name, ctime) of snapshot dirs of a given volume."""
+        with os.scandir(volume.storage) as it:
+            return [(e.name, e.stat().st_ctime) for e in it if e.is_dir()]
 
     @staticmethod
-    def open(root: Path = None):
+    def open(root: Path = None) -> SnapshotStorage:
         global STORAGE
+        # opening the storage again, e.g. from a completion callback, is a no-op
+        if STORAGE is not None and (
+            root is None or STORAGE.root == ensure_path(root).resolve()
+        ):
+            return STORAGE
         STORAGE = SnapshotStorage(root)
+        return STORAGE
 
     @staticmethod
     def close():
         global STORAGE
-        del STORAGE
+        STORAGE = None
 
     @staticmethod
     def find_storage() -> Path | None:
@@ -292,6 +475,9 @@ class SnapshotStorage:
             pass
 
 
+atexit.register(SnapshotStorage.close)
+
+
 class Volume:
     def __init__(self, path: Path = None, exists=False, id: int = None) -> None:
         """
@@ -304,16 +490,22 @@ class Volume:
         if self.path.is_absolute():
             self.path = self.path.relative_to(STORAGE.root)
         self.id: int | None = id
+        self._spath: str = str(self.path)
         # escape volume name
-        self.name: str = escape(self.path)
+        self.name: str = escape(self._spath)
         # path of volume in the filesystem
         self.realpath: Path = STORAGE.root / self.path
+        self._srealpath: str = str(self.realpath)
         # subvolume storage path
         self.storage: Path = STORAGE.path / self.name
 
         if exists:
             self.assert_is_volume()
 
+    @classmethod
+    def from_ref(cls, ref: VolumeRef) -> Volume:
+        return cls(path=ref.path, id=ref.id)
+
     def remove_storage(self):
         self.storage.rmdir()
         STORAGE.unregister(self)
@@ -328,6 +520,7 @@ class Volume:
         # volume doesn't exist, just load the snapshot
         if not self.realpath.exists():
             snapshot.load_to_path(self.realpath)
+            self._invalidate_is_subvolume()
             return snapshot
 
         # volume path exist but is not a subvolume
@@ -335,12 +528,21 @@ class Volume:
 
         self.delete()
         snapshot.load_to_path(self.realpath)
+        self._invalidate_is_subvolume()
 
         # set snapshot as head of the volume
         self.head = snapshot
 
     def delete(self):
-        btrfsutil.delete_subvolume(str(self.realpath))
+        btrfsutil.delete_subvolume(self._srealpath)
+        self._invalidate_is_subvolume()
+
+    @functools.cached_property
+    def is_subvolume(self) -> bool:
+        return btrfsutil.is_subvolume(os.fsencode(self._srealpath))
+
+    def _invalidate_is_subvolume(self):
+        self.__dict__.pop("is_subvolume", None)
 
     @property
     def head(self) -> Snapshot | None:
@@ -354,23 +556,45 @@ class Volume:
     def snapshots(self) -> dict[str, "Snapshot"]:
         return STORAGE.snapshots(self)
 
+    def snapshot_rows(self) -> list[tuple[str, str | None, str, bool]]:
+        return STORAGE.snapshot_rows(self)
+
+    def snapshot_names(self) -> list[str]:
+        return STORAGE.snapshot_names(self)
+
+    def count_snapshots(self) -> int:
+        return STORAGE.count_snapshots(self)
+
+    def snapshots_before(self, time: float) -> list["Snapshot"]:
+        return STORAGE.snapshots_before(self, time)
+
+    def stale_snapshots(self, keep: int) -> list["Snapshot"]:
+        return STORAGE.stale_snapshots(self, keep)
+
     @staticmethod
     def all():
         return STORAGE.volumes()
 
+    @staticmethod
+    def all_snapshot_rows() -> dict[str, list[tuple[str, str | None, str, bool]]]:
+        return STORAGE.volumes_with_snapshot_rows()
+
     def assert_is_volume(self):
         path = self.realpath
         if not path.exists():
             raise SubvolumeNotFound(path)
-        if not btrfsutil.is_subvolume(str(path)):
+        if not self.is_subvolume:
             raise NotASubvolume(path)
 
     def assert_has_snapshots(self):
         if not self.storage.exists():
             raise NoSnapshotsError(self)
 
+    def styled(self) -> str:
+        return f"{GREEN_BOLD}{self._spath}{RESET}"
+
     def __repr__(self) -> str:
-        return str(self.path)
+        return self._spath
 
 
 class Snapshot:
@@ -388,9 +612,12 @@ class Snapshot:
 
         self._name = name
         self._annotation = annotation
+        # cached read-only flag, None if unknown
+        self._readonly: bool | None = None
 
         self.volume: Volume = volume
         self.path: Path = self.volume.storage / self.name
+        self._spath: str = str(self.path)
         self.time: float = time
         self.id: int | None = id
 
@@ -407,6 +634,7 @@ class Snapshot:
         self._name = new_name
         old_path = self.path
         self.path = self.volume.storage / self._name
+        self._spath = str(self.path)
         shutil.move(old_path, self.path)
 
         self.readonly = True
@@ -424,31 +652,41 @@ class Snapshot:
 
     @property
     def readonly(self) -> bool:
-        return btrfsutil.get_subvolume_read_only(self.path)
+        if self._readonly is None:
+            self._readonly = btrfsutil.get_subvolume_read_only(self._spath)
+        return self._readonly
 
     @readonly.setter
     def readonly(self, read_only: bool):
-        btrfsutil.set_subvolume_read_only(str(self.path), read_only=read_only)
+        if self._readonly == read_only:
+            return
+        btrfsutil.set_subvolume_read_only(self._spath, read_only=read_only)
+        self._readonly = read_only
 
     def create(self) -> None:
         self.path.parent.mkdir(exist_ok=True, parents=True)
-        btrfsutil.create_snapshot(
-            str(self.volume.realpath), str(self.path), read_only=True
-        )
+        btrfsutil.create_snapshot(self.volume._srealpath, self._spath, read_only=True)
+        self._readonly = True
         STORAGE.register(self.volume)
         STORAGE.register(self)
         # set snapshot as head of the volume
         self.volume.head = self
 
     def delete(self) -> None:
-        path = str(self.path)
+        self.delete_subvolume()
+        self.unregister()
+
+    def delete_subvolume(self) -> None:
+        """Delete the snapshot subvolume only, safe to call from worker threads."""
         self.readonly = False
-        btrfsutil.delete_subvolume(path)
+        btrfsutil.delete_subvolume(self._spath)
+
+    def unregister(self) -> None:
         STORAGE.unregister(self)
 
     def load_to_path(self, workdir: Path):
         """Create a read-write snapshot of snapshot to workdir."""
-        btrfsutil.create_snapshot(str(self.path), str(workdir), read_only=False)
+        btrfsutil.create_snapshot(self._spath, str(workdir), read_only=False)
 
     def is_head(self) -> bool:
         head = self.volume.head
@@ -456,19 +694,34 @@ class Snapshot:
 
     @property
     def strtime(self):
-        return datetime.fromtimestamp(self.time).strftime(config.DATETIME_FORMAT)
+        return format_time(int(self.time))
 
     @staticmethod
     def generate_name():
-        return hashlib.sha256(os.urandom(16)).hexdigest()[:7]
+        return secrets.token_hex(4)[:7]
 
     def assert_not_exists(self):
         if self.path.exists():
             raise SnapshotExists(self)
 
+    def styled(self) -> str:
+        return (YELLOW_BOLD if self.is_head() else YELLOW) + self.name + RESET
+
     def __repr__(self) -> str:
         return self.name
 
 
+@functools.lru_cache(maxsize=4096)
+def format_time(timestamp: int) -> str:
+    return strftime(config.DATETIME_FORMAT, localtime(timestamp))
+
+
+def get_storage(root: Path | None = None) -> SnapshotStorage:
+    """Return the opened storage, opening it at root on first use."""
+    if STORAGE is None:
+        SnapshotStorage.open(root)
+    return STORAGE
+
+
 def rebuild_metadata():
     STORAGE.rebuild_metadata()
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+from sot import config
+from sot.utils import escape
+
+
+def _path(name: str, key: str) -> Path:
+    return config.CACHE_DIR / f"{name}-{escape(key)}.json"
+
+
+def stamp(*paths: Path) -> list[list[int]]:
+    """Inode and mtime of the paths that exist, to validate entries against."""
+    result = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        result.append([st.st_ino, st.st_mtime_ns])
+    return result
+
+
+def load(name: str, key: str, stamp: list[list[int]]):
+    """Return the cached value, or None if there is none or it is stale."""
+    try:
+        with open(_path(name, key)) as f:
+            entry = json.load(f)
+        if entry["stamp"] == stamp:
+            return entry["value"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def store(name: str, key: str, stamp: list[list[int]], value):
+    path = _path(name, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"stamp": stamp, "value": value}))
+        tmp.replace(path)
+    except OSError:
+        pass
+
+
+def invalidate(name: str, key: str):
+    try:
+        _path(name, key).unlink()
+    except OSError:
+        pass
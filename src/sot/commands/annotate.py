@@ -0,0 +1,24 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+from sot import utils
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+@click.command()
+@args.volume(exists=False)
+@args.snapshot()
+@click.argument("new_annotation", required=False, type=str)
+def annotate(volume: Volume, snapshot: Snapshot, new_annotation: str):
+    """Annotate snapshot"""
+    if new_annotation is None:
+        new_annotation = utils.edit_annotation(snapshot.annotation)
+    snapshot.annotation = new_annotation
+    click.echo(f"Snapshot '{snapshot.styled()}' annotated with: {new_annotation}")
+
+
+command = annotate
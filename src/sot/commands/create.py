@@ -0,0 +1,51 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+from sot import utils
+from sot.style import BLUE, GREEN_BOLD, RESET
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+@click.command()
+@args.volume(exists=True)
+@args.snapshot(new=True)
+@click.option(
+    "-f",
+    "--force",
+    is_flag=True,
+    help="Replace existing snapshot with the same name",
+)
+@click.option(
+    "-m",
+    "--annotation",
+    type=str,
+    default=None,
+    help="Annotation for the snapshot",
+)
+@click.option("-e", "edit_annotation", is_flag=True, help="Edit annotation in $EDITOR")
+def create(
+    volume: Volume,
+    snapshot: Snapshot,
+    force: bool,
+    annotation: str,
+    edit_annotation: bool,
+):
+    """Create new snapshot."""
+    if force:
+        existing = volume.snapshots.get(snapshot.name)
+        if existing is not None:
+            existing.delete()
+    if edit_annotation:
+        annotation = utils.edit_annotation(annotation)
+    snapshot._annotation = annotation
+    snapshot.create()
+    click.echo(
+        f"Snapshot '{GREEN_BOLD}{volume.name}{RESET}/{BLUE}{snapshot.name}{RESET}' created"
+    )
+
+
+command = create
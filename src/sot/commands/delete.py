@@ -0,0 +1,180 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+import functools
+from typing import TYPE_CHECKING, Any, Iterable
+import click
+
+from sot import args
+from sot.style import RESET, YELLOW, YELLOW_BOLD
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+def _today() -> datetime:
+    return datetime.combine(date.today(), datetime.min.time())
+
+
+# relative dates accepted by _DateTime, resolved to local midnight
+_RELATIVE = {
+    "today": _today,
+    "yesterday": lambda: _today() - timedelta(days=1),
+}
+
+
+class _DateTime(click.ParamType):
+    name = "datetime"
+
+    def convert(self, value, param, ctx) -> Any:
+        if isinstance(value, datetime):
+            return value
+        handler = _RELATIVE.get(value)
+        if handler is not None:
+            return handler()
+        try:
+            return _parse_dt(value)
+        except ValueError:
+            self.fail(
+                f"{value!r} does not match the formats {", ".join(_FMTS)}, "
+                f"{", ".join(_RELATIVE)}.",
+                param,
+                ctx,
+            )
+
+    def __repr__(self) -> str:
+        return "DateTime"
+
+
+# formats accepted by click.DateTime, ordered by the length of their output
+_FMTS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_dt(value: str) -> datetime:
+    for fmt in _FMTS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+@click.command()
+@args.volume(exists=False, has_snapshots=True)
+@args.snapshot("snapshots", required=False, nargs=-1)
+@click.option(
+    "-n",
+    "--dry-run",
+    is_flag=True,
+    help="Print what would be done without deleting snapshots",
+)
+@click.option(
+    "-k",
+    "--keep",
+    type=click.IntRange(min=0),
+    help="Number of lastest snapshots to keep",
+)
+@click.option("-b", "--before", type=_DateTime(), help="Delete snapshots before date")
+@click.option("-a", "--all", is_flag=True, help="Delete all snapshots")
+def delete(
+    volume: Volume,
+    before: datetime,
+    snapshots: list[Snapshot],
+    dry_run: bool,
+    keep: int,
+    all: bool,
+):
+    """Delete snapshots."""
+    from btrfsutil import BtrfsUtilError
+
+    if len(snapshots) == 0:
+        if all:
+            snapshots = volume.snapshots.values()
+        elif keep is not None:
+            snapshots = volume.stale_snapshots(keep)
+        elif before is not None:
+            snapshots = volume.snapshots_before(before.timestamp())
+        if len(snapshots) == 0:
+            raise click.UsageError("No snapshots available for deletion.")
+    if dry_run:
+        click.echo("Dry run, no snapshots will be deleted...")
+    else:
+        click.echo("Deleting snapshots...")
+
+    vol_styled = volume.styled()
+    if not dry_run:
+        with args.get_storage().batch():
+            results = _delete_snapshots(snapshots)
+        # unregistering a snapshot clears it as head, render them all plain
+        prefix = f"Deleted snapshot: '{vol_styled}/"
+        deleted = []
+        for s, e in results:
+            if e is None:
+                deleted.append(f"{prefix}{YELLOW}{s.name}{RESET}'")
+            elif isinstance(e, BtrfsUtilError):
+                click.echo(f"Error: {e.strerror}: {e.filename}", err=True)
+            else:
+                click.echo(f"Warning: {e}", err=True)
+        if deleted:
+            click.echo("\n".join(deleted))
+    else:
+        head = volume.head
+        head_id = head.id if head is not None else None
+        prefix = f"Would delete: '{vol_styled}/"
+        for s in snapshots:
+            color = YELLOW_BOLD if s.id == head_id else YELLOW
+            click.echo(f"{prefix}{color}{s.name}{RESET}'")
+    if all or volume.count_snapshots() == 0:
+        if not dry_run:
+            volume.remove_storage()
+            click.echo(f"Removed snapshots dir for subvolume {vol_styled}")
+        else:
+            click.echo(f"Would remove snapshots dir for subvolume {vol_styled}")
+
+
+def _delete_snapshots(
+    snapshots: Iterable[Snapshot],
+) -> list[tuple[Snapshot, Exception | None]]:
+    """Delete snapshots concurrently, each with its error, in the given order.
+
+    btrfsutil releases the GIL in its ioctls, so subvolumes are deleted by worker
+    threads and each snapshot is unregistered from this thread once its
+    subvolume is gone. If this raises, e.g. on Ctrl-C, the queued deletions are
+    cancelled and those already running are still unregistered.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(_delete_subvolume, s) for s in snapshots]
+        results = {}
+        try:
+            for future in as_completed(futures):
+                results[future] = _unregister_deleted(future.result())
+        finally:
+            pending = [f for f in futures if f not in results and not f.cancel()]
+            for future in pending:
+                if future.exception() is None:
+                    _unregister_deleted(future.result())
+    return [results[future] for future in futures]
+
+
+def _unregister_deleted(
+    result: tuple[Snapshot, Exception | None],
+) -> tuple[Snapshot, Exception | None]:
+    snapshot, e = result
+    if e is None:
+        snapshot.unregister()
+    return result
+
+
+def _delete_subvolume(snapshot: Snapshot) -> tuple[Snapshot, Exception | None]:
+    from btrfsutil import BtrfsUtilError
+
+    try:
+        snapshot.delete_subvolume()
+        return snapshot, None
+    except (BtrfsUtilError, Warning) as e:
+        return snapshot, e
+
+
+command = delete
@@ -0,0 +1,41 @@
+from pathlib import Path
+import click
+
+from sot import cache, config
+
+
+@click.command()
+@click.option("-f", "--force", is_flag=True, help="Force rebuild metadata")
+@click.pass_context
+def init(ctx: click.Context, force: bool):
+    """Initialize snapshot storage"""
+    from sot.btrfs import NoStorageError, SnapshotStorage, rebuild_metadata
+
+    if force:
+        SnapshotStorage.open(ctx.obj["root"])
+        rebuild_metadata()
+        click.echo("Metadata rebuilt")
+        return
+
+    root = ctx.obj["root"]
+    if root is None:
+        try:
+            root = SnapshotStorage.find_storage()
+            raise click.UsageError(
+                f"Storage found at '{root}', use -f to rebuild metadata"
+            )
+        except NoStorageError:
+            root = Path.cwd()
+
+    storage_dir = root / config.SNAPSHOT_DIR
+    if storage_dir.exists():
+        raise click.UsageError(f"Storage found at '{root}', use -f to rebuild metadata")
+
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    storage = SnapshotStorage.open(root)
+    # a previous storage at this root may have left completions behind
+    cache.invalidate("volumes", str(storage.root))
+    click.echo(f"Storage initialized at '{root}'")
+
+
+command = init
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import functools
+import os
+import sys
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+from sot.config import MAX_COLUMNS, PAD_SNAPSHOT_NAME
+from sot.style import CYAN, GREEN_BOLD, RESET, YELLOW, YELLOW_BOLD
+
+if TYPE_CHECKING:
+    from sot.btrfs import Volume
+
+
+@click.command(name="list")
+@args.volume(required=False, exists=False, has_snapshots=True)
+@click.option("-v", "--volume-only", is_flag=True, help="List only volumes")
+def list_(volume: Volume, volume_only: bool):
+    """List all snapshots."""
+    from sot.btrfs import Volume
+
+    volumes_rows: dict[str, list[tuple[str, str | None, str, bool]]]
+    args.get_storage()
+
+    lines = []
+    if click.utils.should_strip_ansi(sys.stdout):
+        yellow = yellow_bold = green_bold = cyan = reset = ""
+    else:
+        yellow, yellow_bold, green_bold = YELLOW, YELLOW_BOLD, GREEN_BOLD
+        cyan, reset = CYAN, RESET
+
+    if volume_only:
+        click.echo("Listing all volumes...")
+        for v in Volume.all():
+            head = v.head
+            head = "" if head is None else f"  {yellow_bold}{head.name}{reset}"
+            lines.append(f"{green_bold}{v.path}{reset}{head}\n")
+        _write_stdout("".join(lines))
+        return
+    elif volume is None:
+        click.echo("Listing all snapshots...")
+        volumes_rows = Volume.all_snapshot_rows()
+    else:
+        volumes_rows = {volume.path: volume.snapshot_rows()}
+
+    if not sys.stdout.isatty():
+        # piped output, skip styling and column padding
+        for path, rows in volumes_rows.items():
+            lines.append(f"{path}\n")
+            for name, annotation, strtime, _ in rows:
+                annotation = "" if annotation is None else f"\t{annotation}"
+                lines.append(f"  {name}\t{strtime}{annotation}\n")
+        _write_stdout("".join(lines))
+        return
+
+    size = _terminal_size()
+    maxpad = min(size.columns - 24, MAX_COLUMNS)
+
+    def iter_lines():
+        for path, rows in volumes_rows.items():
+            yield f"{green_bold}{path}{reset}\n"
+            for name, annotation, strtime, is_head in rows:
+                if annotation is None:
+                    annotation = ""
+                else:
+                    # annotations start at the PAD_SNAPSHOT_NAME column
+                    name = name.ljust(PAD_SNAPSHOT_NAME)
+                    annotation = f"({annotation})"
+                annotation = annotation.ljust(maxpad - len(name))
+                color = yellow_bold if is_head else yellow
+                yield f"  {color}{name}{reset}{annotation} {cyan}{strtime}{reset}\n"
+
+    if len(volumes_rows) + sum(map(len, volumes_rows.values())) < size.lines:
+        _write_stdout("".join(iter_lines()))
+    else:
+        # lines are formatted as the pager consumes them, quitting early skips the rest
+        click.echo_via_pager(iter_lines())
+
+
+def _write_stdout(text: str):
+    """Write text to stdout's binary buffer in one go, bypassing line buffering."""
+    stdout = sys.stdout
+    buffer = getattr(stdout, "buffer", None)
+    if buffer is None:
+        stdout.write(text)
+        return
+    stdout.flush()
+    buffer.write(text.encode(stdout.encoding or "utf-8", stdout.errors or "strict"))
+    buffer.flush()
+
+
+@functools.lru_cache(1)
+def _terminal_size() -> os.terminal_size:
+    import shutil
+
+    return shutil.get_terminal_size()
+
+
+command = list_
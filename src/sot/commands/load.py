@@ -0,0 +1,25 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+from sot.style import GREEN, RESET
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+@click.command()
+@args.volume(exists=False)
+@args.snapshot()
+@click.argument("workdir", type=click.Path(file_okay=False, path_type=Path))
+def load(volume: Volume, snapshot: Snapshot, workdir: Path):
+    """Create a read-write snapshot of snapshot to workdir."""
+    if workdir.exists():
+        raise click.UsageError(f"Workdir '{workdir}' already exists")
+    snapshot.load_to_path(workdir)
+    click.echo(f"Snapshot '{snapshot.styled()}' loaded to '{GREEN}{workdir}{RESET}'")
+
+
+command = load
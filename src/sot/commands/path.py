@@ -0,0 +1,19 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot
+
+
+@click.command()
+@args.volume()
+@args.snapshot()
+def path(volume, snapshot: Snapshot):
+    """Print absolute path of snapshot"""
+    print(snapshot.path.resolve())
+
+
+command = path
@@ -0,0 +1,27 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+@click.command()
+@args.volume(exists=False, has_snapshots=True)
+@args.snapshot()
+@click.argument("name", type=click.STRING)
+def rename(volume: Volume, snapshot: Snapshot, name: str):
+    """Rename snapshot"""
+    from sot.btrfs import SnapshotExists
+
+    try:
+        old = snapshot.styled()
+        snapshot.name = name
+        click.echo(f"Renamed Snapshot {old} to {snapshot.styled()}")
+    except SnapshotExists as e:
+        raise click.UsageError(f"Cannot rename 'f{snapshot.name}' to '{name}': {e}")
+
+
+command = rename
@@ -0,0 +1,18 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+
+if TYPE_CHECKING:
+    from sot.btrfs import Volume
+
+
+@click.command()
+@args.volume(exists=True)
+def rm(volume: Volume):
+    """Remove arbitrary volume"""
+    volume.delete()
+
+
+command = rm
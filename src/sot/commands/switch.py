@@ -0,0 +1,21 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import click
+
+from sot import args
+from sot.style import styled
+
+if TYPE_CHECKING:
+    from sot.btrfs import Snapshot, Volume
+
+
+@click.command()
+@args.volume(exists=False, has_snapshots=True)
+@args.snapshot(required=False)
+def switch(volume: Volume, snapshot: Snapshot):
+    """Switch volume to snapshot."""
+    volume.switch(snapshot)
+    click.echo(f"Volume '{volume.styled()}' switched to snapshot '{styled(snapshot)}'")
+
+
+command = switch
@@ -1,4 +1,9 @@
+import os
+from pathlib import Path
+
 DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
 SNAPSHOT_DIR = ".sot"
 MAX_COLUMNS = 60
 PAD_SNAPSHOT_NAME = 10
+# an empty XDG_CACHE_HOME counts as unset
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or "~/.cache").expanduser() / "sot"
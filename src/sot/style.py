@@ -0,0 +1,14 @@
+# ANSI sequences as emitted by click.style, prebuilt for the handful of styles
+# used by sot. click.echo strips them when the output is not a terminal.
+YELLOW = "\x1b[33m"
+YELLOW_BOLD = "\x1b[33m\x1b[1m"
+GREEN = "\x1b[32m"
+GREEN_BOLD = "\x1b[32m\x1b[1m"
+BLUE = "\x1b[34m"
+CYAN = "\x1b[36m"
+RESET = "\x1b[0m"
+
+
+def styled(obj) -> str:
+    """Styled name of a snapshot or volume, empty for None."""
+    return "" if obj is None else obj.styled()
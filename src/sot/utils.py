@@ -1,28 +1,63 @@
+import functools
 import os
 from pathlib import Path
-import click
+import re
+
+
+# "%" is the escape character, "@" stands for "/" in escaped names; both are
+# decoded left to right in a single pass so that "%%t" round-trips
+_ESCAPE_RE = re.compile(r"[%@/]")
+_ESCAPE_MAP = {"%": "%%", "@": "%t", "/": "@"}
+_ESCAPE_SLASH = str.maketrans("/", "@")
+_UNESCAPE_RE = re.compile(r"%%|%t|@")
+_UNESCAPE_MAP = {"%%": "%", "%t": "@", "@": "/"}
 
 
 def escape(path: str) -> str:
-    return (
-        str(path).strip("/").replace(r"%", r"%%").replace("@", r"%t").replace("/", "@")
-    )
+    return _escape_cached(str(path))
 
 
 def unescape(path: str) -> str:
-    return str(path).replace("@", "/").replace("%t", "@").replace(r"%%", "%")
+    return _unescape_cached(str(path))
+
+
+# the same volume and snapshot paths are escaped over and over, memoize on the
+# str form so that any PathLike can still be passed in
+@functools.lru_cache(maxsize=4096)
+def _escape_cached(path: str) -> str:
+    path = path.strip("/")
+    # most paths only contain "/", which maps to a single character
+    if "%" not in path and "@" not in path:
+        return path.translate(_ESCAPE_SLASH)
+    return _ESCAPE_RE.sub(lambda m: _ESCAPE_MAP[m.group(0)], path)
+
+
+@functools.lru_cache(maxsize=4096)
+def _unescape_cached(path: str) -> str:
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPE_MAP[m.group(0)], path)
+
+
+escape.cache_clear = _escape_cached.cache_clear
+unescape.cache_clear = _unescape_cached.cache_clear
 
 
 def ensure_path(path: os.PathLike):
     if isinstance(path, Path):
         return path
+    if isinstance(path, str):
+        return _path_cached(path)
     return Path(path)
 
 
-EDITOR = os.environ.get("EDITOR", "vim")
+@functools.lru_cache(maxsize=4096)
+def _path_cached(path: str) -> Path:
+    return Path(path)
+
 
 def edit_annotation(annotation: str) -> str:
-    edited = click.edit(annotation, editor=EDITOR)
+    import click
+
+    edited = click.edit(annotation, editor=os.environ.get("EDITOR", "vim"))
     if edited is not None:
         return edited.strip()
     return annotation